@@ -1,20 +1,102 @@
 import cv2
 import numpy as np
-import mediapipe as mp
-import math
 import sys
 import time
+import argparse
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-from collections import deque
+from collections import deque, namedtuple
+from dataclasses import dataclass, asdict, fields
+from typing import Optional
 import pickle
 import os
+import glob
+import queue
+import gc
+import json
+import tracemalloc
+
+try:
+    import mediapipe as mp
+except ImportError:
+    mp = None
+
+# pycaw hanya tersedia di Windows; di platform lain jalankan mode VISUAL ONLY
+try:
+    from comtypes import CLSCTX_ALL
+    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+except ImportError:
+    AudioUtilities = None
 
 # ==================== CONFIGURATION ====================
-CAMERA_INDEX = 1
+# Nilai bawaan; ubah lewat file konfigurasi, profil atau argumen CLI (lihat AgioConfig)
+CAMERA_INDEX = 1              # Dicoba pertama sebelum indeks lain
 FACE_DETECTION_ENABLED = True
 AGE_ESTIMATION_ENABLED = True
+MAX_FRAME_WIDTH = 800         # Frame lebih lebar di-resize sebelum inferensi
+
+# ==================== MODEL SETTINGS ====================
+FACE_MODEL_SELECTION = 1      # 0 = jarak dekat (<2 m), 1 = jarak jauh
+FACE_DETECTION_CONFIDENCE = 0.5
+MAX_NUM_FACES = 1
+FACE_MESH_DETECTION_CONFIDENCE = 0.5
+FACE_MESH_TRACKING_CONFIDENCE = 0.5
+HAND_DETECTION_CONFIDENCE = 0.7
+HAND_TRACKING_CONFIDENCE = 0.7
+PINCH_DIST_MIN = 30           # Rentang awal jarak ibu jari-telunjuk (px)
+PINCH_DIST_MAX = 200
+
+# ==================== CAPTURE SETTINGS ====================
+# Diterapkan sebelum frame pertama dibaca agar tidak terjadi renegosiasi format
+CAPTURE_BACKEND = "auto"      # auto, v4l2, ffmpeg, dshow, msmf, gstreamer
+CAPTURE_FOURCC = "MJPG"       # MJPG menghindari YUYV tanpa kompresi di V4L2
+CAPTURE_BUFFER_SIZE = 1       # Kedalaman buffer driver (frame)
+CAPTURE_FPS = 30.0
+CAPTURE_WIDTH = 640
+CAPTURE_HEIGHT = 480
+CAPTURE_DRAIN = False         # Buang frame lama yang masih antre di buffer
+CAPTURE_MAX_DRAIN = 4         # Frame basi maksimum yang dibuang per baca (default V4L2: 4 buffer)
+
+# ==================== METRICS SETTINGS ====================
+METRICS_PORT = 0              # 0 = endpoint nonaktif
+METRICS_HOST = "127.0.0.1"    # Hanya localhost
+VOLUME_WRITE_THRESHOLD = 1.0  # Perubahan volume (%) minimum sebelum menulis ke sistem
+
+# ==================== SESSION LOG SETTINGS ====================
+SESSION_LOG_DIR = None        # None = log per-frame nonaktif
+SESSION_LOG_CHUNK_RECORDS = 65536   # Record per file chunk (~1 jam pada 20 fps)
+SESSION_LOG_MAX_CHUNKS = 24 * 14    # Chunk tertua dihapus setelah batas ini
+SESSION_LOG_BATCH = 256       # Record yang dikumpulkan sebelum dikirim ke thread penulis
+SESSION_LOG_MAX_FACES = 4     # Jumlah wajah yang disimpan per frame
+
+# ==================== LANDMARK SMOOTHING SETTINGS ====================
+LANDMARK_SMOOTHING = True
+LANDMARK_MIN_CUTOFF = 1.0     # Hz; makin kecil makin halus saat wajah diam
+LANDMARK_BETA = 10.0          # Makin besar makin cepat mengikuti gerakan
+LANDMARK_TRACK_DISTANCE = 0.1 # Jarak centroid (relatif frame) maksimum untuk track yang sama
+FACE_TRACK_TIMEOUT_FRAMES = 15 # Frame tanpa wajah sebelum track landmark dilepas
+SMOOTHED_AGE_HISTORY = 3      # History estimator cukup pendek bila landmark sudah halus
+SMOOTHED_FACE_SIZE_HISTORY = 2
+AGE_DISPLAY_HISTORY = 20      # Frame yang dirata-rata untuk "Estimated Age" di panel
+SMOOTHED_AGE_DISPLAY_HISTORY = 5
+
+# ==================== GESTURE SETTINGS ====================
+MAX_NUM_HANDS = 2
+DRAW_HAND_SKELETON = True
+GESTURE_HOLD_FRAMES = 8       # Frame berturut-turut sebelum fist/palm dianggap gestur
+TRACK_TIMEOUT_FRAMES = 10     # Frame tanpa tangan sebelum track kontrol dilepas
+PALM_MIN_FINGER_SPREAD = 0.3  # Jarak rata-rata ujung jari bersebelahan (relatif skala tangan) untuk palm
+
+# ==================== SOAK TEST SETTINGS ====================
+SOAK_SAMPLE_INTERVAL = 60.0   # Detik antar sampel memori/frame time
+SOAK_WARMUP_SECONDS = 30.0    # Baseline diambil setelah warmup
+SOAK_MAX_RSS_GROWTH_MB = 50.0
+SOAK_MAX_P99_MS = 100.0
+SOAK_MAX_DRIFT = 0.25         # Kenaikan median frame time maksimum (25%)
+SOAK_WINDOW_FRAMES = 1 << 16  # Kapasitas buffer frame time per jendela sampel
+SOAK_MIN_WINDOW_FRAMES = 100  # Jendela lebih kecil digabung ke jendela berikutnya sebelum dinilai
 
 # ==================== LAYOUT SETTINGS ====================
 INFO_PANEL_WIDTH = 300
@@ -22,7 +104,7 @@ VOLUME_BAR_WIDTH = 80
 
 # ==================== AGE ESTIMATION MODEL ====================
 class ImprovedAgeEstimator:
-    def __init__(self):
+    def __init__(self, age_history_len=10, face_size_history_len=5):
         # Data untuk kalibrasi usia (dari penelitian wajah manusia)
         self.age_data = {
             # Rentang usia dan karakteristik wajah
@@ -45,8 +127,8 @@ class ImprovedAgeEstimator:
         }
         
         # History untuk smoothing
-        self.age_history = deque(maxlen=10)
-        self.face_size_history = deque(maxlen=5)
+        self.age_history = deque(maxlen=age_history_len)
+        self.face_size_history = deque(maxlen=face_size_history_len)
         
         # Faktor kalibrasi berdasarkan jarak kamera
         self.distance_factor = 1.0
@@ -265,6 +347,8 @@ class ImprovedAgeEstimator:
 # ==================== VOLUME CONTROL ====================
 def setup_volume_control():
     try:
+        if AudioUtilities is None:
+            raise RuntimeError("pycaw not installed")
         devices = AudioUtilities.GetSpeakers()
         interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
         volume = cast(interface, POINTER(IAudioEndpointVolume))
@@ -279,53 +363,753 @@ def setup_volume_control():
         print("  Running in VISUAL ONLY mode")
         return None, None, None
 
-# ==================== MEDIAPIPE SETUP ====================
-mp_hands = mp.solutions.hands
-mp_face_detection = mp.solutions.face_detection
-mp_face_mesh = mp.solutions.face_mesh
-mp_drawing = mp.solutions.drawing_utils
-
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=1,
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.7
+def should_write_volume(level, last_written, threshold=VOLUME_WRITE_THRESHOLD):
+    """Tulis jika perubahan cukup besar, atau jika level baru mencapai 0%/100%"""
+    if last_written is None:
+        return True
+    if level != last_written and (level <= 0 or level >= 100):
+        return True
+    return abs(level - last_written) >= threshold
+
+def write_volume(volume, min_vol, max_vol, level):
+    vol_db = min_vol + (max_vol - min_vol) * (level / 100.0)
+    volume.SetMasterVolumeLevel(vol_db, None)
+
+# ==================== INFERENCE BACKENDS ====================
+# Semua backend mengembalikan struktur netral yang sama sehingga main() tidak
+# bergantung pada MediaPipe:
+#   face detector   -> list[Detection]   (koordinat relatif 0-1)
+#   face landmarker -> list[list[Landmark]] (indeks mengikuti Face Mesh, 478 titik)
+#   hand landmarker -> list[list[Landmark]] (21 titik per tangan)
+Detection = namedtuple("Detection", ["bbox", "keypoints", "score"])
+Landmark = namedtuple("Landmark", ["x", "y", "z"])
+
+FACE_MESH_POINTS = 478
+HAND_POINTS = 21
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
 )
 
-if FACE_DETECTION_ENABLED:
-    face_detection = mp_face_detection.FaceDetection(
-        model_selection=1,
-        min_detection_confidence=0.5
-    )
+YUNET_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "models", "face_detection_yunet_2023mar.onnx")
+REPLAY_MAX_KEYPOINTS = 6      # Keypoint deteksi dipad ke jumlah ini di file replay
+
+class InferenceBackend:
+    """Antarmuka dasar: process(rgb) per frame, close() saat selesai"""
+    name = "base"
+    
+    def process(self, rgb):
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+def _require_mediapipe():
+    if mp is None or not hasattr(mp, "solutions"):
+        raise RuntimeError("MediaPipe with the 'solutions' API is not installed")
+
+class MediaPipeFaceDetector(InferenceBackend):
+    name = "mediapipe"
+    
+    def __init__(self, model_selection=FACE_MODEL_SELECTION, min_confidence=FACE_DETECTION_CONFIDENCE):
+        _require_mediapipe()
+        self.model = mp.solutions.face_detection.FaceDetection(
+            model_selection=model_selection,
+            min_detection_confidence=min_confidence
+        )
+    
+    def process(self, rgb):
+        results = self.model.process(rgb)
+        if not results.detections:
+            return []
+        detections = []
+        for detection in results.detections:
+            bbox = detection.location_data.relative_bounding_box
+            keypoints = [(kp.x, kp.y) for kp in detection.location_data.relative_keypoints]
+            detections.append(Detection((bbox.xmin, bbox.ymin, bbox.width, bbox.height),
+                                        keypoints, detection.score[0]))
+        return detections
+    
+    def close(self):
+        self.model.close()
+
+class MediaPipeFaceLandmarker(InferenceBackend):
+    name = "mediapipe"
+    
+    def __init__(self, max_num_faces=MAX_NUM_FACES, min_detection_confidence=FACE_MESH_DETECTION_CONFIDENCE,
+                 min_tracking_confidence=FACE_MESH_TRACKING_CONFIDENCE):
+        _require_mediapipe()
+        # refine_landmarks wajib: estimator memakai titik iris 468/473
+        self.model = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=max_num_faces,
+            refine_landmarks=True,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+    
+    def process(self, rgb):
+        results = self.model.process(rgb)
+        if not results.multi_face_landmarks:
+            return []
+        return [face.landmark for face in results.multi_face_landmarks]
+    
+    def close(self):
+        self.model.close()
+
+class MediaPipeHandLandmarker(InferenceBackend):
+    name = "mediapipe"
+    
+    def __init__(self, max_num_hands=MAX_NUM_HANDS, min_detection_confidence=HAND_DETECTION_CONFIDENCE,
+                 min_tracking_confidence=HAND_TRACKING_CONFIDENCE):
+        _require_mediapipe()
+        self.model = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+    
+    def process(self, rgb):
+        results = self.model.process(rgb)
+        if not results.multi_hand_landmarks:
+            return []
+        return [hand.landmark for hand in results.multi_hand_landmarks]
+    
+    def close(self):
+        self.model.close()
+
+class OpenCVDnnFaceDetector(InferenceBackend):
+    """Detektor wajah YuNet (ONNX) lewat cv2.dnn, berjalan di CPU"""
+    name = "opencv-dnn"
+    
+    def __init__(self, model_path=YUNET_MODEL_PATH, score_threshold=FACE_DETECTION_CONFIDENCE):
+        if not os.path.exists(model_path):
+            raise RuntimeError(
+                f"YuNet model not found at {model_path} "
+                "(download face_detection_yunet_2023mar.onnx from the OpenCV model zoo)"
+            )
+        self.model = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+        self.model.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.model.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.input_size = None
+    
+    def process(self, rgb):
+        h, w = rgb.shape[:2]
+        if self.input_size != (w, h):
+            self.model.setInputSize((w, h))
+            self.input_size = (w, h)
+        # YuNet dilatih dengan input BGR
+        _, faces = self.model.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        detections = []
+        for face in faces:
+            x, y, fw, fh = face[:4]
+            # Keypoint YuNet: mata kanan, mata kiri, hidung, mulut kanan, mulut kiri
+            keypoints = [(face[4 + 2 * k] / w, face[5 + 2 * k] / h) for k in range(5)]
+            detections.append(Detection((x / w, y / h, fw / w, fh / h), keypoints, float(face[14])))
+        return detections
 
-if AGE_ESTIMATION_ENABLED:
-    face_mesh = mp_face_mesh.FaceMesh(
-        static_image_mode=False,
-        max_num_faces=1,
-        refine_landmarks=True,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
+def synthetic_face_landmarks(cx=0.5, cy=0.42, face_w=0.30, face_h=0.40, ratios=(0.20, 0.17, 0.38, 0.72, 0.05)):
+    """Bangun 478 landmark Face Mesh dengan rasio wajah yang diketahui"""
+    eye_r, nose_r, mouth_r, jaw_r, brow_r = ratios
+    points = np.tile([cx, cy, 0.0], (FACE_MESH_POINTS, 1))
+    half_w, half_h = face_w / 2, face_h / 2
+    
+    points[234, 0], points[454, 0] = cx - half_w, cx + half_w
+    points[10, 1], points[152, 1] = cy - half_h, cy + half_h
+    points[33, :2], points[263, :2] = (cx - eye_r * half_w, cy - 0.1 * face_h), (cx + eye_r * half_w, cy - 0.1 * face_h)
+    points[468, :2], points[473, :2] = (cx - 0.35 * half_w, cy - 0.1 * face_h), (cx + 0.35 * half_w, cy - 0.1 * face_h)
+    points[65, :2] = (cx - 0.35 * half_w, cy - (0.1 + brow_r) * face_h)
+    points[295, :2] = (cx + 0.35 * half_w, cy - (0.1 + brow_r) * face_h)
+    points[168, 1], points[1, 1] = cy - 0.1 * face_h, cy + (nose_r - 0.1) * face_h
+    points[78, :2], points[308, :2] = (cx - mouth_r * half_w, cy + 0.25 * face_h), (cx + mouth_r * half_w, cy + 0.25 * face_h)
+    points[132, :2], points[361, :2] = (cx - jaw_r * half_w, cy + 0.3 * face_h), (cx + jaw_r * half_w, cy + 0.3 * face_h)
+    return points
+
+def synthetic_hand_landmarks(pinch, cx=0.7, cy=0.6, scale=0.25):
+    """Bangun 21 landmark tangan; pinch 0 (jari rapat) sampai 1 (terbuka lebar)"""
+    points = np.zeros((HAND_POINTS, 3))
+    points[0, :2] = (cx, cy + 0.5 * scale)
+    extended = (0.40, 0.53, 0.66, 0.79)
+    folded = (0.40, 0.50, 0.42, 0.35)
+    for finger in range(5):
+        base = 1 + finger * 4
+        angle = np.radians(-40 + finger * 15)
+        # Ibu jari dan telunjuk lurus, jari lain ditekuk (pose mencubit)
+        reaches = extended if finger < 2 else folded
+        for joint in range(4):
+            reach = scale * reaches[joint]
+            points[base + joint, :2] = (cx + reach * np.sin(angle), cy + 0.5 * scale - reach * np.cos(angle))
+    # Ujung ibu jari (4) dan telunjuk (8) saling mendekat sesuai pinch
+    mid = (points[4, :2] + points[8, :2]) / 2
+    points[4, :2] = mid + (points[4, :2] - mid) * pinch
+    points[8, :2] = mid + (points[8, :2] - mid) * pinch
+    return points
+
+def _as_landmarks(points):
+    return [Landmark(*p) for p in points.tolist()]
+
+def save_canned_landmarks(path, frames):
+    """Simpan urutan landmark ke .npz (array numerik saja, tanpa pickle)"""
+    detections = [d for frame in frames for d in frame["detections"]]
+    keypoints = np.full((len(detections), REPLAY_MAX_KEYPOINTS, 2), np.nan)
+    for row, detection in enumerate(detections):
+        points = np.asarray(detection[1], dtype=np.float64)[:REPLAY_MAX_KEYPOINTS]
+        keypoints[row, :len(points)] = points
+    faces = [face for frame in frames for face in frame["faces"]]
+    hands = [hand for frame in frames for hand in frame["hands"]]
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            detection_count=np.array([len(frame["detections"]) for frame in frames], dtype=np.int32),
+            face_count=np.array([len(frame["faces"]) for frame in frames], dtype=np.int32),
+            hand_count=np.array([len(frame["hands"]) for frame in frames], dtype=np.int32),
+            bbox=np.array([d[0] for d in detections], dtype=np.float64).reshape(-1, 4),
+            keypoints=keypoints,
+            score=np.array([d[2] for d in detections], dtype=np.float64),
+            faces=np.array(faces, dtype=np.float64).reshape(-1, FACE_MESH_POINTS, 3),
+            hands=np.array(hands, dtype=np.float64).reshape(-1, HAND_POINTS, 3),
+        )
+
+def load_canned_landmarks(path):
+    """Muat file replay .npz; allow_pickle=False sehingga tidak ada kode yang dieksekusi"""
+    with np.load(path, allow_pickle=False) as data:
+        det_splits = np.cumsum(data["detection_count"])[:-1]
+        face_splits = np.cumsum(data["face_count"])[:-1]
+        hand_splits = np.cumsum(data["hand_count"])[:-1]
+        frames = []
+        for bboxes, keypoints, scores, faces, hands in zip(
+                np.split(data["bbox"], det_splits), np.split(data["keypoints"], det_splits),
+                np.split(data["score"], det_splits), np.split(data["faces"], face_splits),
+                np.split(data["hands"], hand_splits)):
+            detections = [
+                Detection(tuple(bbox.tolist()), [tuple(kp) for kp in kps.tolist() if not np.isnan(kp).any()],
+                          float(score))
+                for bbox, kps, score in zip(bboxes, keypoints, scores)
+            ]
+            frames.append({"detections": detections, "faces": list(faces), "hands": list(hands)})
+    return frames
+
+def generate_canned_landmarks(num_frames=300, seed=0):
+    """Urutan landmark sintetis yang deterministik (wajah diam, tangan mencubit)"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(num_frames):
+        face = synthetic_face_landmarks() + rng.normal(0, 0.002, (FACE_MESH_POINTS, 3))
+        pinch = 0.55 + 0.45 * np.sin(2 * np.pi * i / 120)
+        hand = synthetic_hand_landmarks(pinch) + rng.normal(0, 0.001, (HAND_POINTS, 3))
+        x0, y0 = face[234, 0], face[10, 1]
+        bbox = (x0, y0, face[454, 0] - x0, face[152, 1] - y0)
+        keypoints = [tuple(face[k, :2]) for k in (468, 473, 1, 13, 234, 454)]
+        frames.append({
+            "detections": [Detection(bbox, keypoints, 0.92)],
+            "faces": [face],
+            "hands": [hand],
+        })
+    return frames
+
+class FakeReplay:
+    """Sumber landmark bersama untuk backend fake; maju satu langkah per frame"""
+    
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = {}
+    
+    def next(self, key):
+        # Setiap backend punya kursor sendiri sehingga urutan pemanggilan bebas
+        i = self.position.get(key, 0)
+        self.position[key] = i + 1
+        return self.frames[i % len(self.frames)][key]
+
+class FakeFaceDetector(InferenceBackend):
+    name = "fake"
+    
+    def __init__(self, replay):
+        self.replay = replay
+    
+    def process(self, rgb):
+        return [Detection(*d) for d in self.replay.next("detections")]
+
+class FakeFaceLandmarker(InferenceBackend):
+    name = "fake"
+    
+    def __init__(self, replay, max_num_faces=MAX_NUM_FACES):
+        self.replay = replay
+        self.max_num_faces = max_num_faces
+    
+    def process(self, rgb):
+        faces = self.replay.next("faces")[:self.max_num_faces]
+        return [_as_landmarks(np.asarray(face)) for face in faces]
+
+class FakeHandLandmarker(InferenceBackend):
+    name = "fake"
+    
+    def __init__(self, replay, max_num_hands=MAX_NUM_HANDS):
+        self.replay = replay
+        self.max_num_hands = max_num_hands
+    
+    def process(self, rgb):
+        hands = self.replay.next("hands")[:self.max_num_hands]
+        return [_as_landmarks(np.asarray(hand)) for hand in hands]
+
+# Factory menerima (replay, config)
+FACE_DETECTOR_BACKENDS = {
+    "mediapipe": lambda replay, config: MediaPipeFaceDetector(
+        config.face_model_selection, config.face_detection_confidence),
+    "opencv-dnn": lambda replay, config: OpenCVDnnFaceDetector(
+        config.yunet_model_path, config.face_detection_confidence),
+    "fake": lambda replay, config: FakeFaceDetector(replay),
+}
+FACE_LANDMARKER_BACKENDS = {
+    "mediapipe": lambda replay, config: MediaPipeFaceLandmarker(
+        config.max_num_faces, config.face_mesh_detection_confidence, config.face_mesh_tracking_confidence),
+    "fake": lambda replay, config: FakeFaceLandmarker(replay, config.max_num_faces),
+}
+HAND_LANDMARKER_BACKENDS = {
+    "mediapipe": lambda replay, config: MediaPipeHandLandmarker(
+        config.max_num_hands, config.hand_detection_confidence, config.hand_tracking_confidence),
+    "fake": lambda replay, config: FakeHandLandmarker(replay, config.max_num_hands),
+}
+
+def create_backends(config, replay_file=None):
+    """Buat backend inferensi yang dipilih; backend fake berbagi satu replay"""
+    replay = None
+    if "fake" in (config.face_detector, config.face_landmarker, config.hand_landmarker):
+        frames = load_canned_landmarks(replay_file) if replay_file else generate_canned_landmarks()
+        replay = FakeReplay(frames)
+    backends = (
+        FACE_DETECTOR_BACKENDS[config.face_detector](replay, config),
+        FACE_LANDMARKER_BACKENDS[config.face_landmarker](replay, config),
+        HAND_LANDMARKER_BACKENDS[config.hand_landmarker](replay, config),
     )
+    print(f"✓ Inference backends: face={backends[0].name} "
+          f"mesh={backends[1].name} hands={backends[2].name}")
+    return backends
+
+def record_landmarks(recording, detections, faces, hands):
+    """Simpan output backend satu frame dalam format yang bisa diputar ulang"""
+    recording.append({
+        "detections": [tuple(d) for d in detections],
+        "faces": [np.array([(p.x, p.y, p.z) for p in face]) for face in faces],
+        "hands": [np.array([(p.x, p.y, p.z) for p in hand]) for hand in hands],
+    })
+
+# ==================== GESTURE ENGINE ====================
+FINGERTIPS = (4, 8, 12, 16, 20)
+FINGER_TIPS = (8, 12, 16, 20)     # Tanpa ibu jari
+FINGER_PIPS = (6, 10, 14, 18)
+THUMB_IP, PINKY_MCP = 3, 17
+
+GestureState = namedtuple("GestureState", [
+    "hand_count", "control_index", "track_id", "gesture", "raw_gesture", "event",
+    "thumb_tip", "index_tip", "pinch_distance", "scale", "orientation",
+])
+
+def hands_to_array(hand_landmarks_list, width, height):
+    """Semua tangan -> array (n, 21, 3) dalam piksel"""
+    points = np.array([[(p.x, p.y, p.z) for p in hand] for hand in hand_landmarks_list],
+                      dtype=np.float32).reshape(-1, HAND_POINTS, 3)
+    points[..., 0] *= width
+    points[..., 1] *= height
+    return points
+
+def hand_geometry(points):
+    """Geometri semua tangan dalam satu langkah vektor.
+    
+    Mengembalikan jarak antar ujung jari (n, 5, 5), skala tangan (n,),
+    orientasi dalam derajat (n,, 0 = tegak) dan status jari lurus (n, 5)
+    dengan urutan FINGERTIPS (kolom 0 = ibu jari).
+    """
+    xy = points[..., :2]
+    tips = xy[:, FINGERTIPS]
+    tip_distances = np.linalg.norm(tips[:, :, None] - tips[:, None], axis=-1)
+    
+    wrist = xy[:, 0]
+    axis = xy[:, 9] - wrist
+    scale = np.linalg.norm(axis, axis=-1)
+    orientation = np.degrees(np.arctan2(axis[:, 0], -axis[:, 1]))
+    
+    tip_reach = np.linalg.norm(xy[:, FINGER_TIPS] - wrist[:, None], axis=-1)
+    pip_reach = np.linalg.norm(xy[:, FINGER_PIPS] - wrist[:, None], axis=-1)
+    fingers_extended = tip_reach > pip_reach * 1.1
+    
+    # Ibu jari lurus bila ujungnya menjauh dari telapak (pangkal kelingking) melewati sendi IP
+    pinky_base = xy[:, PINKY_MCP]
+    thumb_extended = (np.linalg.norm(xy[:, 4] - pinky_base, axis=-1)
+                      > np.linalg.norm(xy[:, THUMB_IP] - pinky_base, axis=-1) * 1.1)
+    extended = np.column_stack([thumb_extended, fingers_extended])
+    return tip_distances, scale, orientation, extended
+
+class GestureEngine:
+    """Pilih tangan pengendali per track dan klasifikasikan gesturnya.
+    
+    Gestur: "pinch" (volume), "fist" (mute) dan "palm" (pause kontrol).
+    Palm butuh kelima jari lurus dan jari-jari terbuka lebar, sehingga pinch
+    lebar dengan jari lain santai tetap dianggap pinch.
+    Fist/palm harus bertahan GESTURE_HOLD_FRAMES frame sebelum memicu event;
+    raw_gesture adalah klasifikasi frame ini sebelum hold tersebut.
+    """
+    
+    def __init__(self, hold_frames=GESTURE_HOLD_FRAMES, track_timeout=TRACK_TIMEOUT_FRAMES,
+                 palm_spread=PALM_MIN_FINGER_SPREAD):
+        self.hold_frames = hold_frames
+        self.track_timeout = track_timeout
+        self.palm_spread = palm_spread
+        self.track_id = 0
+        self.track_wrist = None
+        self.missing_frames = 0
+        self.candidate = None
+        self.candidate_frames = 0
+        self.active = "pinch"
+    
+    def reset(self):
+        self.track_wrist = None
+        self.candidate = None
+        self.candidate_frames = 0
+        self.active = "pinch"
+    
+    def _select_hand(self, wrists, scale):
+        if self.track_wrist is not None:
+            gaps = np.linalg.norm(wrists - self.track_wrist, axis=-1)
+            nearest = int(np.argmin(gaps))
+            if gaps[nearest] < 2 * max(scale[nearest], 1.0):
+                return nearest
+        # Track baru: tangan terbesar (paling dekat ke kamera)
+        self.track_id += 1
+        self.candidate = None
+        self.candidate_frames = 0
+        self.active = "pinch"
+        return int(np.argmax(scale))
+    
+    def update(self, hand_landmarks_list, width, height):
+        if not hand_landmarks_list:
+            self.missing_frames += 1
+            if self.missing_frames > self.track_timeout:
+                self.reset()
+            return None
+        self.missing_frames = 0
+        
+        points = hands_to_array(hand_landmarks_list, width, height)
+        tip_distances, scale, orientation, extended = hand_geometry(points)
+        
+        control = self._select_hand(points[:, 0, :2], scale)
+        self.track_wrist = points[control, 0, :2]
+        
+        # Jarak ujung telunjuk-tengah, tengah-manis dan manis-kelingking
+        finger_spread = tip_distances[control, (1, 2, 3), (2, 3, 4)].mean() / max(scale[control], 1.0)
+        if extended[control].all() and finger_spread > self.palm_spread:
+            gesture = "palm"
+        elif not extended[control, 1:].any():
+            gesture = "fist"
+        else:
+            gesture = "pinch"
+        
+        if gesture == self.candidate:
+            self.candidate_frames += 1
+        else:
+            self.candidate = gesture
+            self.candidate_frames = 1
+        
+        event = None
+        hold = 1 if gesture == "pinch" else self.hold_frames
+        if self.candidate_frames == hold and gesture != self.active:
+            self.active = gesture
+            if gesture != "pinch":
+                event = gesture
+        
+        thumb = points[control, 4, :2]
+        index = points[control, 8, :2]
+        return GestureState(
+            hand_count=len(points),
+            control_index=control,
+            track_id=self.track_id,
+            gesture=self.active,
+            raw_gesture=gesture,
+            event=event,
+            thumb_tip=(int(thumb[0]), int(thumb[1])),
+            index_tip=(int(index[0]), int(index[1])),
+            pinch_distance=float(tip_distances[control, 0, 1]),
+            scale=float(scale[control]),
+            orientation=float(orientation[control]),
+        )
+
+# ==================== LANDMARK SMOOTHING ====================
+# Hanya titik Face Mesh yang dipakai estimator usia dan overlay
+FEATURE_LANDMARKS = (1, 10, 33, 65, 78, 132, 152, 168, 234, 263, 295, 308, 361, 454, 468, 473)
+OVERLAY_EYE_LANDMARKS = (468, 473)
+
+class LandmarkSmoother:
+    """Filter One Euro per track wajah untuk subset landmark, dalam satu langkah vektor.
+    
+    update() mengembalikan dict indeks -> Landmark sehingga bisa langsung
+    dipakai extract_facial_features() seperti daftar landmark mentah.
+    update() harus dipanggil setiap frame (dengan [] bila tidak ada wajah)
+    agar track yang hilang kedaluwarsa; timestamp memakai jam monotonik.
+    """
+    
+    def __init__(self, indices=FEATURE_LANDMARKS, min_cutoff=LANDMARK_MIN_CUTOFF, beta=LANDMARK_BETA,
+                 d_cutoff=1.0, track_distance=LANDMARK_TRACK_DISTANCE, track_timeout=FACE_TRACK_TIMEOUT_FRAMES):
+        self.indices = indices
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.track_distance = track_distance
+        self.track_timeout = track_timeout
+        self.tracks = {}
+        self.next_track_id = 0
+    
+    def reset(self):
+        self.tracks.clear()
+    
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+    
+    def _filter(self, track, points, timestamp):
+        dt = max(timestamp - track["timestamp"], 1e-3)
+        velocity = (points - track["points"]) / dt
+        velocity = track["velocity"] + self._alpha(self.d_cutoff, dt) * (velocity - track["velocity"])
+        cutoff = self.min_cutoff + self.beta * np.abs(velocity)
+        track["points"] = track["points"] + self._alpha(cutoff, dt) * (points - track["points"])
+        track["velocity"] = velocity
+        track["timestamp"] = timestamp
+    
+    def _match(self, centroid, claimed):
+        best, best_gap = None, self.track_distance
+        for track_id, track in self.tracks.items():
+            if track_id in claimed:
+                continue
+            gap = np.linalg.norm(track["points"][:, :2].mean(axis=0) - centroid)
+            if gap < best_gap:
+                best, best_gap = track_id, gap
+        return best
+    
+    def update(self, faces, timestamp):
+        smoothed = []
+        claimed = set()
+        for landmarks in faces:
+            points = np.array([(landmarks[i].x, landmarks[i].y, landmarks[i].z) for i in self.indices])
+            track_id = self._match(points[:, :2].mean(axis=0), claimed)
+            if track_id is None:
+                track_id = self.next_track_id
+                self.next_track_id += 1
+                self.tracks[track_id] = {"points": points, "velocity": np.zeros_like(points),
+                                         "timestamp": timestamp, "missing": 0}
+            else:
+                self._filter(self.tracks[track_id], points, timestamp)
+            claimed.add(track_id)
+            self.tracks[track_id]["missing"] = 0
+            smoothed.append(dict(zip(self.indices, map(Landmark._make, self.tracks[track_id]["points"].tolist()))))
+        
+        for track_id in list(self.tracks):
+            if track_id not in claimed:
+                self.tracks[track_id]["missing"] += 1
+                if self.tracks[track_id]["missing"] > self.track_timeout:
+                    del self.tracks[track_id]
+        return smoothed
 
 # ==================== CAMERA CONNECTION ====================
-def connect_to_camera():
+CAPTURE_BACKENDS = {
+    "auto": cv2.CAP_ANY,
+    "v4l2": cv2.CAP_V4L2,
+    "ffmpeg": cv2.CAP_FFMPEG,
+    "dshow": cv2.CAP_DSHOW,
+    "msmf": cv2.CAP_MSMF,
+    "gstreamer": cv2.CAP_GSTREAMER,
+}
+
+def configure_capture(cap, fourcc=CAPTURE_FOURCC, width=CAPTURE_WIDTH, height=CAPTURE_HEIGHT,
+                      fps=CAPTURE_FPS, buffer_size=CAPTURE_BUFFER_SIZE):
+    """Terapkan format capture sebelum streaming dimulai"""
+    # Urutan penting untuk V4L2: FOURCC dulu, lalu resolusi, lalu fps
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    if width and height:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+def describe_capture(cap):
+    """Laporan setting yang benar-benar dinegosiasikan oleh backend"""
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    fourcc = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)) if code > 0 else "----"
+    try:
+        backend = cap.getBackendName()
+    except cv2.error:
+        backend = "unknown"
+    return {
+        "backend": backend,
+        "fourcc": fourcc,
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "buffer_size": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+def print_capture_report(settings, requested):
+    print("  Negotiated capture settings:")
+    for key, value in settings.items():
+        wanted = requested.get(key)
+        note = ""
+        if wanted and str(wanted) != str(value) and not (key == "fps" and abs(float(wanted) - value) < 0.5):
+            note = f"  (requested {wanted})"
+        print(f"    {key:<12}{value}{note}")
+
+def read_frame(cap, drain=CAPTURE_DRAIN, max_drain=CAPTURE_MAX_DRAIN):
+    """Baca satu frame; pada mode drain, frame lama di buffer dibuang dulu.
+
+    Mengembalikan (ret, frame, dropped).
+    """
+    if not drain:
+        ret, frame = cap.read()
+        return ret, frame, 0
+    
+    # grab() yang langsung kembali berarti frame sudah lama antre di buffer;
+    # grab() yang memblokir berarti kita sudah sampai di frame terbaru
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    stale_threshold = 0.5 / fps if fps > 0 else 0.005
+    
+    t0 = time.perf_counter()
+    if not cap.grab():
+        return False, None, 0
+    blocked = time.perf_counter() - t0 > stale_threshold
+    
+    # Hanya frame yang benar-benar tergantikan oleh grab() instan yang dihitung
+    dropped = 0
+    while not blocked and dropped < max_drain:
+        t0 = time.perf_counter()
+        if not cap.grab():
+            return False, None, dropped
+        dropped += 1
+        blocked = time.perf_counter() - t0 > stale_threshold
+    
+    ret, frame = cap.retrieve()
+    return ret, frame, dropped
+
+def is_camera_source(source):
+    """True untuk kamera live (termasuk 'synthetic-camera'); file dan 'synthetic' tidak punya frame basi"""
+    return source is None or source == "synthetic-camera" or isinstance(source, int) or str(source).isdigit()
+
+def open_capture(source, backend=CAPTURE_BACKEND, **capture_options):
+    api = CAPTURE_BACKENDS.get(backend, cv2.CAP_ANY)
+    cap = cv2.VideoCapture(source, api)
+    if cap.isOpened():
+        configure_capture(cap, **capture_options)
+    return cap
+
+class SyntheticCapture:
+    """Sumber frame sintetis deterministik dengan antarmuka cv2.VideoCapture
+    
+    Dengan queue_depth > 0 sumber meniru kamera live: frame "tiba" sesuai fps
+    jam dinding, driver menyimpan paling banyak queue_depth frame, dan grab()
+    memblokir sampai frame berikutnya tiba bila antrean kosong. Mode ini
+    dipakai untuk menguji --drain tanpa kamera.
+    """
+    
+    def __init__(self, width=CAPTURE_WIDTH, height=CAPTURE_HEIGHT, fps=CAPTURE_FPS, queue_depth=0):
+        self.width = width or 640
+        self.height = height or 480
+        self.fps = fps or 30
+        self.queue_depth = queue_depth
+        self.frame_index = 0
+        self.start = time.perf_counter()
+        gradient = np.linspace(40, 200, self.width, dtype=np.uint8)
+        self.background = np.dstack([np.tile(gradient, (self.height, 1))] * 3)
+    
+    def isOpened(self):
+        return True
+    
+    def grab(self):
+        if not self.queue_depth:
+            self.frame_index += 1
+            return True
+        
+        # Frame terbaru yang sudah tiba; yang lebih tua dari kedalaman antrean sudah ditimpa driver
+        latest = int((time.perf_counter() - self.start) * self.fps)
+        wanted = self.frame_index + 1
+        if wanted > latest:
+            time.sleep(max(0.0, self.start + wanted / self.fps - time.perf_counter()))
+        self.frame_index = max(wanted, latest - self.queue_depth + 1)
+        return True
+    
+    def retrieve(self):
+        frame = self.background.copy()
+        t = self.frame_index / self.fps
+        center = (int(self.width * (0.5 + 0.3 * np.sin(t))), int(self.height * 0.45))
+        cv2.circle(frame, center, self.height // 6, (90, 140, 200), -1)
+        return True, frame
+    
+    def read(self):
+        self.grab()
+        return self.retrieve()
+    
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_POS_FRAMES: self.frame_index,
+        }.get(prop, 0)
+    
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES and not self.queue_depth:
+            self.frame_index = int(value)
+            return True
+        return False
+    
+    def getBackendName(self):
+        return "SYNTHETIC-CAMERA" if self.queue_depth else "SYNTHETIC"
+    
+    def release(self):
+        pass
+
+def connect_to_camera(source=None, backend=CAPTURE_BACKEND, fourcc=CAPTURE_FOURCC,
+                      width=CAPTURE_WIDTH, height=CAPTURE_HEIGHT, fps=CAPTURE_FPS,
+                      buffer_size=CAPTURE_BUFFER_SIZE, camera_index=CAMERA_INDEX):
     print("=" * 60)
     print("CAMERA CONNECTION TEST")
     print("=" * 60)
     
-    camera_indices = [1, 0, 2]
+    capture_options = dict(fourcc=fourcc, width=width, height=height,
+                           fps=fps, buffer_size=buffer_size)
+    
+    if source in ("synthetic", "synthetic-camera"):
+        queue_depth = (buffer_size or CAPTURE_MAX_DRAIN) if source == "synthetic-camera" else 0
+        cap = SyntheticCapture(width, height, fps, queue_depth)
+        print(f"✓ Using {source} frame source")
+        print_capture_report(describe_capture(cap), capture_options)
+        return cap
+    
+    if source is None:
+        camera_indices = [camera_index] + [i for i in (0, 1, 2) if i != camera_index]
+    elif isinstance(source, str) and not source.isdigit():
+        # Sumber file/URL: format ditentukan oleh file, bukan oleh kita
+        camera_indices = [source]
+        capture_options = dict(fourcc=None, width=None, height=None,
+                               fps=None, buffer_size=buffer_size)
+    else:
+        camera_indices = [int(source)]
     
     for index in camera_indices:
         print(f"\nTrying camera index {index}...")
-        cap = cv2.VideoCapture(index)
+        cap = open_capture(index, backend, **capture_options)
         
         if cap.isOpened():
             ret, frame = cap.read()
             if ret:
                 print(f"✓ Camera found at index {index}")
                 print(f"  Resolution: {frame.shape[1]}x{frame.shape[0]}")
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                print_capture_report(describe_capture(cap), capture_options)
                 return cap
             else:
                 print("✗ Can't read frame")
@@ -476,21 +1260,23 @@ def create_volume_bar(frame, volume_percent, x_offset, y_offset, bar_width=40, b
     
     return frame
 
-def draw_face_info(image, detection, width, height, estimated_age=None, age_group=None, age_color=None, age_confidence=0.7):
-    bbox = detection.location_data.relative_bounding_box
-    x = int(bbox.xmin * width)
-    y = int(bbox.ymin * height)
-    w = int(bbox.width * width)
-    h = int(bbox.height * height)
+def draw_face_info(image, detection, width, height, estimated_age=None, age_group=None, age_color=None, age_confidence=0.7,
+                   eye_points=None):
+    xmin, ymin, bbox_w, bbox_h = detection.bbox
+    x = int(xmin * width)
+    y = int(ymin * height)
+    w = int(bbox_w * width)
+    h = int(bbox_h * height)
     
     rect_color = age_color if age_color else (0, 255, 0)
     cv2.rectangle(image, (x, y), (x + w, y + h), rect_color, 2)
     
-    keypoints = detection.location_data.relative_keypoints
+    # Titik mata dari landmark yang sudah dihaluskan jika tersedia
+    keypoints = eye_points if eye_points else detection.keypoints
     
     for kp in keypoints[:2]:
-        kp_x = int(kp.x * width)
-        kp_y = int(kp.y * height)
+        kp_x = int(kp[0] * width)
+        kp_y = int(kp[1] * height)
         cv2.circle(image, (kp_x, kp_y), 3, (0, 0, 255), -1)
     
     if y > 50:
@@ -516,12 +1302,20 @@ def draw_face_info(image, detection, width, height, estimated_age=None, age_grou
         cv2.putText(image, face_label, (x, text_y),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, label_color, 1)
     
-    conf = detection.score[0] * 100
+    conf = detection.score * 100
     cv2.putText(image, f"Det: {conf:.0f}%", (x, text_y + text_direction * 40),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 200, 0), 1)
     
     return conf, w, h
 
+def draw_hand_skeleton(image, landmarks, width, height):
+    points = [(int(p.x * width), int(p.y * height)) for p in landmarks]
+    for start, end in HAND_CONNECTIONS:
+        cv2.line(image, points[start], points[end], (255, 0, 0), 1)
+    for point in points:
+        cv2.circle(image, point, 2, (0, 255, 0), 2)
+    return image
+
 # ==================== CALIBRATION FUNCTIONS ====================
 def calibrate_for_age(real_age):
     """Fungsi untuk kalibrasi berdasarkan usia asli pengguna"""
@@ -534,13 +1328,796 @@ def calibrate_for_age(real_age):
     
     return real_age
 
+# ==================== METRICS ====================
+class LatencyHistogram:
+    """Histogram latensi (detik) dengan bucket tetap, format Prometheus"""
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0.0
+    
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.total += seconds
+    
+    def snapshot(self):
+        return list(self.counts), self.total
+
+class PipelineMetrics:
+    """Counter pipeline yang hanya ditulis oleh loop frame.
+    
+    Loop frame tidak pernah mengambil lock; scraper hanya membaca atribut
+    (atomik di bawah GIL) sehingga scrape tidak mengganggu loop.
+    """
+    STAGES = ("capture", "preprocess", "face", "hands", "render")
+    
+    def __init__(self, profile="desktop"):
+        self.profile = profile
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_with_face = 0
+        self.frames_with_hand = 0
+        self.volume_writes = 0
+        self.volume_writes_suppressed = 0
+        self.fps = 0.0
+        self.presence = 0
+        self.stage_latency = {stage: LatencyHistogram() for stage in self.STAGES}
+        self.last_stage_latency = dict.fromkeys(self.STAGES, 0.0)
+    
+    def observe_stage(self, stage, seconds):
+        self.stage_latency[stage].observe(seconds)
+        self.last_stage_latency[stage] = seconds
+    
+    def render(self):
+        """Render semua metrik dalam format teks Prometheus"""
+        processed = self.frames_processed
+        lines = []
+        
+        def metric(name, kind, help_text, value):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        
+        metric("agio_frames_captured_total", "counter", "Frames read from the capture source.", self.frames_captured)
+        metric("agio_frames_processed_total", "counter", "Frames that went through the full pipeline.", processed)
+        metric("agio_frames_dropped_total", "counter", "Stale frames discarded by capture draining.", self.frames_dropped)
+        metric("agio_frames_with_face_total", "counter", "Processed frames with at least one face.", self.frames_with_face)
+        metric("agio_frames_with_hand_total", "counter", "Processed frames with at least one hand.", self.frames_with_hand)
+        metric("agio_face_detection_ratio", "gauge", "Share of processed frames with a face.",
+               f"{self.frames_with_face / processed:.4f}" if processed else 0)
+        metric("agio_hand_detection_ratio", "gauge", "Share of processed frames with a hand.",
+               f"{self.frames_with_hand / processed:.4f}" if processed else 0)
+        metric("agio_volume_writes_total", "counter", "System volume writes issued.", self.volume_writes)
+        metric("agio_volume_writes_suppressed_total", "counter",
+               "Volume writes skipped because the level did not change enough.", self.volume_writes_suppressed)
+        metric("agio_fps", "gauge", "Frames per second over the last second.", f"{self.fps:.2f}")
+        metric("agio_presence", "gauge", "1 when a face is in view, else 0.", self.presence)
+        lines.append("# HELP agio_config_info Active configuration profile.")
+        lines.append("# TYPE agio_config_info gauge")
+        lines.append(f'agio_config_info{{profile="{self.profile}"}} 1')
+        
+        lines.append("# HELP agio_stage_latency_seconds Per-stage processing latency.")
+        lines.append("# TYPE agio_stage_latency_seconds histogram")
+        for stage, histogram in self.stage_latency.items():
+            counts, total = histogram.snapshot()
+            cumulative = 0
+            for bound, count in zip(histogram.BUCKETS, counts):
+                cumulative += count
+                lines.append(f'agio_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'agio_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+            lines.append(f'agio_stage_latency_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'agio_stage_latency_seconds_count{{stage="{stage}"}} {cumulative}')
+        
+        return "\n".join(lines) + "\n"
+
+def start_metrics_server(metrics, port=METRICS_PORT, host=METRICS_HOST):
+    """Jalankan endpoint /metrics di thread background (daemon)"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠ Metrics endpoint disabled: {e}")
+        return None
+    
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    print(f"✓ Metrics endpoint at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+# ==================== SESSION LOG ====================
+SESSION_RECORD_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("face_count", "u1"),
+    ("face_age", "f4", (SESSION_LOG_MAX_FACES,)),
+    ("age_confidence", "f4", (SESSION_LOG_MAX_FACES,)),
+    ("detect_confidence", "f4", (SESSION_LOG_MAX_FACES,)),
+    ("hand_distance", "f4"),
+    ("volume", "f4"),
+    ("stage_ms", "f4", (len(PipelineMetrics.STAGES),)),
+])
+
+class SessionLogger:
+    """Log per-frame dalam chunk .npy ber-memory-map dengan skema tetap.
+    
+    Loop frame hanya mengisi satu baris di buffer batch; batch penuh dikirim
+    ke thread penulis yang menyalinnya ke chunk memmap dan merotasi file.
+    Baris yang belum terpakai di chunk memiliki timestamp 0.
+    """
+    
+    def __init__(self, log_dir, chunk_records=SESSION_LOG_CHUNK_RECORDS,
+                 max_chunks=SESSION_LOG_MAX_CHUNKS, batch_size=SESSION_LOG_BATCH):
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.chunk_records = chunk_records
+        self.max_chunks = max_chunks
+        self.batch_size = batch_size
+        # PID membuat id unik untuk run yang dimulai pada detik yang sama
+        self.session_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        
+        self.batch = np.zeros(batch_size, dtype=SESSION_RECORD_DTYPE)
+        self.batch_fill = 0
+        self.records_written = 0
+        
+        self.chunk = None
+        self.chunk_index = 0
+        self.chunk_fill = 0
+        
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self._writer_loop, name="session-log-writer", daemon=True)
+        self.writer.start()
+    
+    def log(self, timestamp, faces, hand_distance, volume, stage_seconds):
+        """faces: list of (age, age_confidence, detect_confidence)"""
+        row = self.batch[self.batch_fill]
+        row["timestamp"] = timestamp
+        row["face_count"] = min(len(faces), 255)
+        row["face_age"] = np.nan
+        row["age_confidence"] = np.nan
+        row["detect_confidence"] = np.nan
+        for i, (age, age_conf, detect_conf) in enumerate(faces[:SESSION_LOG_MAX_FACES]):
+            row["face_age"][i] = np.nan if age is None else age
+            row["age_confidence"][i] = age_conf
+            row["detect_confidence"][i] = detect_conf
+        row["hand_distance"] = np.nan if hand_distance is None else hand_distance
+        row["volume"] = np.nan if volume is None else volume
+        row["stage_ms"] = [seconds * 1000 for seconds in stage_seconds]
+        
+        self.batch_fill += 1
+        if self.batch_fill == self.batch_size:
+            self._submit()
+    
+    def _submit(self):
+        if self.batch_fill:
+            self.queue.put(self.batch[:self.batch_fill])
+            # Buffer baru; buffer lama kini milik thread penulis
+            self.batch = np.zeros(self.batch_size, dtype=SESSION_RECORD_DTYPE)
+            self.batch_fill = 0
+    
+    def _chunk_path(self, index):
+        return os.path.join(self.log_dir, f"session-{self.session_id}-{index:04d}.npy")
+    
+    def _open_chunk(self):
+        self.chunk = np.lib.format.open_memmap(
+            self._chunk_path(self.chunk_index), mode="w+",
+            dtype=SESSION_RECORD_DTYPE, shape=(self.chunk_records,)
+        )
+        self.chunk_fill = 0
+        self._enforce_retention()
+    
+    def _close_chunk(self):
+        if self.chunk is not None:
+            self.chunk.flush()
+            del self.chunk
+            self.chunk = None
+            self.chunk_index += 1
+    
+    def _enforce_retention(self):
+        chunks = sorted(glob.glob(os.path.join(self.log_dir, "session-*.npy")))
+        expired = chunks[:max(0, len(chunks) - self.max_chunks)]
+        for path in expired:
+            os.remove(path)
+        
+        # Config sesi ikut dihapus setelah chunk terakhirnya hilang
+        remaining = chunks[len(expired):]
+        for path in expired:
+            prefix = path[:path.rfind("-") + 1]
+            if not any(other.startswith(prefix) for other in remaining):
+                config_path = prefix + "config.json"
+                if os.path.exists(config_path):
+                    os.remove(config_path)
+    
+    def _write(self, records):
+        while len(records):
+            if self.chunk is None:
+                self._open_chunk()
+            n = min(len(records), self.chunk_records - self.chunk_fill)
+            self.chunk[self.chunk_fill:self.chunk_fill + n] = records[:n]
+            self.chunk_fill += n
+            self.records_written += n
+            records = records[n:]
+            if self.chunk_fill == self.chunk_records:
+                self._close_chunk()
+        if self.chunk is not None:
+            self.chunk.flush()
+    
+    def _writer_loop(self):
+        while True:
+            records = self.queue.get()
+            if records is None:
+                break
+            try:
+                self._write(records)
+            except OSError as e:
+                print(f"⚠ Session log write failed: {e}")
+    
+    def close(self):
+        self._submit()
+        self.queue.put(None)
+        self.writer.join()
+        self._close_chunk()
+    
+    def write_config(self, config_dict):
+        """Simpan config efektif di samping chunk agar run bisa dibandingkan"""
+        path = os.path.join(self.log_dir, f"session-{self.session_id}-config.json")
+        with open(path, "w") as f:
+            json.dump(config_dict, f, indent=2)
+    
+    def session_pattern(self):
+        return f"session-{self.session_id}-*.npy"
+
+def iter_session_chunks(log_dir, pattern="session-*.npy"):
+    """Iterasi (session_id, chunk) satu per satu (memmap read-only), hanya baris terisi"""
+    for path in sorted(glob.glob(os.path.join(log_dir, pattern))):
+        name = os.path.basename(path)
+        session_id = name[len("session-"):name.rfind("-")]
+        chunk = np.load(path, mmap_mode="r")
+        # Baris terisi selalu berurutan dari awal chunk
+        filled = int(np.count_nonzero(chunk["timestamp"] > 0))
+        yield session_id, chunk[:filled]
+
+def summarize_session(log_dir, pattern="session-*.npy"):
+    """Statistik gabungan dengan memori konstan, per chunk"""
+    frames = 0
+    frames_with_face = 0
+    age_count = 0
+    age_sum = 0.0
+    age_conf_sum = 0.0
+    age_min = np.inf
+    age_max = -np.inf
+    stage_sum = np.zeros(len(PipelineMetrics.STAGES))
+    # Durasi dijumlah per sesi agar jeda antar sesi tidak ikut terhitung
+    session_spans = {}
+    
+    for session_id, chunk in iter_session_chunks(log_dir, pattern):
+        if not len(chunk):
+            continue
+        frames += len(chunk)
+        frames_with_face += int(np.count_nonzero(chunk["face_count"]))
+        stage_sum += chunk["stage_ms"].sum(axis=0, dtype=np.float64)
+        
+        ages = chunk["face_age"]
+        valid = ~np.isnan(ages)
+        if valid.any():
+            age_count += int(valid.sum())
+            age_sum += float(ages[valid].sum(dtype=np.float64))
+            age_conf_sum += float(chunk["age_confidence"][valid].sum(dtype=np.float64))
+            age_min = min(age_min, float(ages[valid].min()))
+            age_max = max(age_max, float(ages[valid].max()))
+        
+        first_ts, last_ts = session_spans.get(session_id, (float(chunk["timestamp"][0]), None))
+        session_spans[session_id] = (first_ts, float(chunk["timestamp"][-1]))
+    
+    if not frames:
+        return None
+    return {
+        "frames": frames,
+        "sessions": len(session_spans),
+        "duration_s": sum(last - first for first, last in session_spans.values()),
+        "face_presence": frames_with_face / frames,
+        "age_samples": age_count,
+        "mean_age": age_sum / age_count if age_count else None,
+        "mean_age_confidence": age_conf_sum / age_count if age_count else None,
+        "min_age": age_min if age_count else None,
+        "max_age": age_max if age_count else None,
+        "mean_stage_ms": dict(zip(PipelineMetrics.STAGES, (stage_sum / frames).tolist())),
+    }
+
+def print_session_summary(summary, calibrated_age=None):
+    print(f"\n=== FINAL STATISTICS ===")
+    hours = summary["duration_s"] / 3600
+    print(f"Frames Logged: {summary['frames']} over {hours:.2f} hours "
+          f"in {summary['sessions']} session(s)")
+    print(f"Face Presence: {summary['face_presence'] * 100:.1f}% of frames")
+    if summary["mean_age"] is not None:
+        print(f"Average Estimated Age: {summary['mean_age']:.1f} years")
+        print(f"Age Range: {summary['min_age']:.0f} - {summary['max_age']:.0f} years")
+        print(f"Average Age Confidence: {summary['mean_age_confidence'] * 100:.0f}%")
+        if calibrated_age:
+            print(f"Calibrated Age: {calibrated_age} years")
+            accuracy = 100 - abs(summary["mean_age"] - calibrated_age) / calibrated_age * 100
+            print(f"Estimated Accuracy: {accuracy:.1f}%")
+    stages = "  ".join(f"{stage}={ms:.2f}" for stage, ms in summary["mean_stage_ms"].items())
+    print(f"Mean Stage Latency (ms): {stages}")
+
+# ==================== SOAK TEST ====================
+def current_rss_mb():
+    """RSS proses saat ini (MB); None jika tidak bisa dibaca"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class SoakMonitor:
+    """Jalankan pipeline selama durasi tertentu dan pantau kebocoran/degradasi.
+    
+    Setiap SOAK_SAMPLE_INTERVAL detik dicatat RSS, memori tracemalloc,
+    jumlah GC per generasi serta p50/p99 frame time jendela tersebut.
+    Baseline diambil setelah warmup; finish() membandingkan akhir run
+    dengan baseline terhadap ambang batas.
+    """
+    
+    def __init__(self, duration, sample_interval=SOAK_SAMPLE_INTERVAL,
+                 warmup=SOAK_WARMUP_SECONDS, max_rss_growth_mb=SOAK_MAX_RSS_GROWTH_MB,
+                 max_p99_ms=SOAK_MAX_P99_MS, max_drift=SOAK_MAX_DRIFT):
+        self.duration = duration
+        self.sample_interval = min(sample_interval, max(duration / 10, 1.0))
+        self.warmup = min(warmup, duration * 0.1)
+        self.max_rss_growth_mb = max_rss_growth_mb
+        self.max_p99_ms = max_p99_ms
+        self.max_drift = max_drift
+        
+        self.frame_times = np.zeros(SOAK_WINDOW_FRAMES, dtype=np.float32)
+        self.window_fill = 0
+        self.frames = 0
+        self.samples = []
+        self.baseline = None
+        self.baseline_snapshot = None
+        self.final_snapshot = None
+        
+        tracemalloc.start()
+        self.start = time.perf_counter()
+        self.next_sample = self.start + self.sample_interval
+    
+    def tick(self, frame_seconds):
+        """Catat satu frame; False jika durasi soak sudah habis"""
+        self.frame_times[self.window_fill % SOAK_WINDOW_FRAMES] = frame_seconds
+        self.window_fill += 1
+        self.frames += 1
+        
+        now = time.perf_counter()
+        if self.baseline is None and now - self.start >= self.warmup:
+            # Buang frame warmup agar tidak mencemari jendela pertama
+            self.window_fill = 0
+            self.baseline = self._sample(now, min_window=None)
+            self.baseline_snapshot = tracemalloc.take_snapshot()
+            self.next_sample = now + self.sample_interval
+        elif self.baseline is not None and now >= self.next_sample:
+            self.samples.append(self._sample(now))
+            self.next_sample = now + self.sample_interval
+        return now - self.start < self.duration
+    
+    def _sample(self, now, min_window=SOAK_MIN_WINDOW_FRAMES):
+        """Sampel memori; frame time hanya dinilai bila jendela berisi >= min_window frame.
+        
+        Jendela yang terlalu pendek dibawa ke sampel berikutnya; min_window None
+        berarti sampel tanpa frame time (baseline).
+        """
+        sample = {
+            "elapsed_s": round(now - self.start, 1),
+            "frames": self.frames,
+            "rss_mb": current_rss_mb(),
+            "traced_mb": tracemalloc.get_traced_memory()[0] / 2**20,
+            "gc_counts": [stats["collections"] for stats in gc.get_stats()],
+        }
+        if min_window is not None and self.window_fill >= max(min_window, 1):
+            window = self.frame_times[:min(self.window_fill, SOAK_WINDOW_FRAMES)] * 1000
+            sample["p50_ms"] = float(np.percentile(window, 50))
+            sample["p99_ms"] = float(np.percentile(window, 99))
+            self.window_fill = 0
+        if "p99_ms" in sample:
+            window_text = f" p99={sample['p99_ms']:.1f}ms"
+        else:
+            window_text = " (baseline)" if self.baseline is None else " (short window, frame time not scored)"
+        print(f"[soak] {sample['elapsed_s']:>8.1f}s frames={sample['frames']} "
+              f"rss={sample['rss_mb'] or 0:.1f}MB traced={sample['traced_mb']:.1f}MB{window_text}")
+        return sample
+    
+    def finish(self, top=10):
+        """Ambil sampel terakhir, periksa ambang batas, kembalikan laporan"""
+        now = time.perf_counter()
+        if self.baseline is not None:
+            # Sisa jendela yang terlalu pendek hanya dipakai untuk memori,
+            # kecuali belum ada jendela lain sama sekali
+            has_windows = any("p99_ms" in s for s in self.samples)
+            self.samples.append(self._sample(now, SOAK_MIN_WINDOW_FRAMES if has_windows else 1))
+        self.final_snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        
+        failures = []
+        windows = [s for s in self.samples if "p99_ms" in s]
+        if self.baseline is None or not windows:
+            failures.append("soak ended before the warmup finished")
+        else:
+            last = self.samples[-1]
+            if last["rss_mb"] is not None and self.baseline["rss_mb"] is not None:
+                growth = last["rss_mb"] - self.baseline["rss_mb"]
+                if growth > self.max_rss_growth_mb:
+                    failures.append(f"RSS grew {growth:.1f} MB (limit {self.max_rss_growth_mb} MB)")
+            worst = max(s["p99_ms"] for s in windows)
+            if worst > self.max_p99_ms:
+                failures.append(f"p99 frame time {worst:.1f} ms (limit {self.max_p99_ms} ms)")
+            drift = windows[-1]["p50_ms"] / max(windows[0]["p50_ms"], 1e-6) - 1
+            if drift > self.max_drift:
+                failures.append(f"median frame time drifted {drift * 100:.0f}% "
+                                f"(limit {self.max_drift * 100:.0f}%)")
+        
+        top_allocations = []
+        if self.baseline_snapshot is not None:
+            for stat in self.final_snapshot.compare_to(self.baseline_snapshot, "lineno")[:top]:
+                top_allocations.append(str(stat))
+        
+        return {
+            "passed": not failures,
+            "failures": failures,
+            "duration_s": round(now - self.start, 1),
+            "frames": self.frames,
+            "baseline": self.baseline,
+            "samples": self.samples,
+            "top_allocation_growth": top_allocations,
+        }
+
+def print_soak_report(report):
+    print(f"\n=== SOAK TEST {'PASSED' if report['passed'] else 'FAILED'} ===")
+    print(f"Duration: {report['duration_s']}s, frames: {report['frames']}")
+    for failure in report["failures"]:
+        print(f"  ✗ {failure}")
+    if report["top_allocation_growth"]:
+        print("Top allocation growth since warmup:")
+        for line in report["top_allocation_growth"]:
+            print(f"  {line}")
+
+# ==================== CONFIG & PROFILES ====================
+@dataclass
+class AgioConfig:
+    """Konfigurasi efektif satu run.
+    
+    Urutan prioritas: nilai bawaan < profil < file konfigurasi (JSON) < argumen CLI.
+    Divalidasi sekali saat startup lewat validate().
+    """
+    profile: str = "desktop"
+    
+    # Capture
+    source: Optional[str] = None
+    camera_index: int = CAMERA_INDEX
+    capture_backend: str = CAPTURE_BACKEND
+    fourcc: str = CAPTURE_FOURCC
+    width: int = CAPTURE_WIDTH
+    height: int = CAPTURE_HEIGHT
+    capture_fps: float = CAPTURE_FPS
+    buffer_size: int = CAPTURE_BUFFER_SIZE
+    drain: bool = CAPTURE_DRAIN
+    loop: bool = False
+    headless: bool = False
+    max_frame_width: int = MAX_FRAME_WIDTH
+    
+    # Inference
+    face_detection_enabled: bool = FACE_DETECTION_ENABLED
+    age_estimation_enabled: bool = AGE_ESTIMATION_ENABLED
+    face_detector: str = "mediapipe"
+    face_landmarker: str = "mediapipe"
+    hand_landmarker: str = "mediapipe"
+    yunet_model_path: str = YUNET_MODEL_PATH
+    face_model_selection: int = FACE_MODEL_SELECTION
+    face_detection_confidence: float = FACE_DETECTION_CONFIDENCE
+    max_num_faces: int = MAX_NUM_FACES
+    face_mesh_detection_confidence: float = FACE_MESH_DETECTION_CONFIDENCE
+    face_mesh_tracking_confidence: float = FACE_MESH_TRACKING_CONFIDENCE
+    max_num_hands: int = MAX_NUM_HANDS
+    hand_detection_confidence: float = HAND_DETECTION_CONFIDENCE
+    hand_tracking_confidence: float = HAND_TRACKING_CONFIDENCE
+    
+    # Gesture & volume
+    dist_min: int = PINCH_DIST_MIN
+    dist_max: int = PINCH_DIST_MAX
+    draw_skeleton: bool = DRAW_HAND_SKELETON
+    volume_write_threshold: float = VOLUME_WRITE_THRESHOLD
+    
+    # Landmark smoothing
+    landmark_smoothing: bool = LANDMARK_SMOOTHING
+    landmark_min_cutoff: float = LANDMARK_MIN_CUTOFF
+    landmark_beta: float = LANDMARK_BETA
+    
+    # Telemetry
+    metrics_port: int = METRICS_PORT
+    session_log: Optional[str] = SESSION_LOG_DIR
+    soak_max_rss_growth_mb: float = SOAK_MAX_RSS_GROWTH_MB
+    soak_max_p99_ms: float = SOAK_MAX_P99_MS
+    
+    @classmethod
+    def from_dict(cls, values):
+        """Buat config dari dict dengan pemeriksaan nama dan tipe field"""
+        types = {f.name: f.type for f in fields(cls)}
+        errors = []
+        typed = {}
+        for name, value in values.items():
+            if name not in types:
+                errors.append(f"unknown setting '{name}'")
+                continue
+            expected = types[name]
+            if expected == Optional[str]:
+                # source boleh ditulis sebagai indeks kamera, mis. {"source": 0}
+                if name == "source" and isinstance(value, int) and not isinstance(value, bool):
+                    value = str(value)
+                ok = value is None or isinstance(value, str)
+            elif expected is bool:
+                ok = isinstance(value, bool)
+            elif expected is int:
+                ok = isinstance(value, int) and not isinstance(value, bool)
+            elif expected is float:
+                ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+                value = float(value) if ok else value
+            else:
+                ok = isinstance(value, expected)
+            if not ok:
+                type_name = "str or null" if expected == Optional[str] else expected.__name__
+                errors.append(f"{name} must be {type_name}, got {value!r}")
+            typed[name] = value
+        if errors:
+            raise ValueError("; ".join(errors))
+        return cls(**typed)
+    
+    def validate(self):
+        errors = []
+        
+        def check(condition, message):
+            if not condition:
+                errors.append(message)
+        
+        check(self.profile in PROFILES, f"unknown profile '{self.profile}' (choose from {', '.join(PROFILES)})")
+        check(self.camera_index >= 0, "camera_index must be >= 0")
+        check(self.capture_backend in CAPTURE_BACKENDS, f"unknown capture_backend '{self.capture_backend}'")
+        check(len(self.fourcc) in (0, 4), "fourcc must be 4 characters or empty")
+        check(self.width > 0 and self.height > 0, "width and height must be positive")
+        check(self.capture_fps > 0, "capture_fps must be positive")
+        check(self.buffer_size >= 0, "buffer_size must be >= 0")
+        check(self.max_frame_width >= 160, "max_frame_width must be >= 160")
+        check(self.face_detector in FACE_DETECTOR_BACKENDS, f"unknown face_detector '{self.face_detector}'")
+        check(self.face_landmarker in FACE_LANDMARKER_BACKENDS, f"unknown face_landmarker '{self.face_landmarker}'")
+        check(self.hand_landmarker in HAND_LANDMARKER_BACKENDS, f"unknown hand_landmarker '{self.hand_landmarker}'")
+        check(self.face_model_selection in (0, 1), "face_model_selection must be 0 or 1")
+        for name in ("face_detection_confidence", "face_mesh_detection_confidence",
+                     "face_mesh_tracking_confidence", "hand_detection_confidence", "hand_tracking_confidence"):
+            check(0.0 <= getattr(self, name) <= 1.0, f"{name} must be between 0 and 1")
+        check(self.max_num_faces >= 1, "max_num_faces must be >= 1")
+        check(self.max_num_hands >= 1, "max_num_hands must be >= 1")
+        check(0 < self.dist_min < self.dist_max, "dist_min must be positive and below dist_max")
+        check(self.volume_write_threshold >= 0, "volume_write_threshold must be >= 0")
+        check(self.landmark_min_cutoff > 0 and self.landmark_beta >= 0,
+              "landmark_min_cutoff must be positive and landmark_beta >= 0")
+        check(0 <= self.metrics_port <= 65535, "metrics_port must be between 0 and 65535")
+        check(self.soak_max_rss_growth_mb > 0 and self.soak_max_p99_ms > 0, "soak limits must be positive")
+        
+        if errors:
+            raise ValueError("; ".join(errors))
+        return self
+
+# Profil hanya menyimpan selisih terhadap nilai bawaan
+PROFILES = {
+    "desktop": {},
+    "low-power-kiosk": {
+        "capture_fps": 15.0,
+        "drain": True,
+        "max_frame_width": 640,
+        "face_model_selection": 0,
+        "max_num_hands": 1,
+        "draw_skeleton": False,
+    },
+    "batch": {
+        "headless": True,
+        "drain": False,
+        "draw_skeleton": False,
+    },
+}
+
+# Bawaan mode soak: tanpa kamera dan tanpa MediaPipe kecuali diminta eksplisit
+SOAK_DEFAULTS = {
+    "source": "synthetic",
+    "face_detector": "fake",
+    "face_landmarker": "fake",
+    "hand_landmarker": "fake",
+}
+
+# Mode soak selalu tanpa jendela dan mengulang sumber file
+SOAK_OVERRIDES = {
+    "headless": True,
+    "loop": True,
+}
+
+def load_config(args):
+    """Gabungkan profil, file konfigurasi dan override CLI lalu validasi"""
+    file_values = {}
+    if args.config:
+        try:
+            with open(args.config) as f:
+                file_values = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"cannot read config file {args.config}: {e}")
+        if not isinstance(file_values, dict):
+            raise ValueError(f"config file {args.config} must contain a JSON object")
+    
+    # Hanya argumen yang benar-benar diberikan yang ada di namespace
+    config_names = {f.name for f in fields(AgioConfig)}
+    cli_values = {name: value for name, value in vars(args).items() if name in config_names}
+    
+    profile = cli_values.get("profile", file_values.get("profile", "desktop"))
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile '{profile}' (choose from {', '.join(PROFILES)})")
+    
+    values = dict(PROFILES[profile])
+    if args.soak:
+        values.update(SOAK_DEFAULTS)
+    values.update(file_values)
+    values.update(cli_values)
+    if args.soak:
+        values.update(SOAK_OVERRIDES)
+    values["profile"] = profile
+    return AgioConfig.from_dict(values).validate()
+
+def print_config(config):
+    print("=" * 60)
+    print(f"EFFECTIVE CONFIGURATION (profile: {config.profile})")
+    print("=" * 60)
+    defaults = AgioConfig()
+    for name, value in asdict(config).items():
+        marker = "" if value == getattr(defaults, name) else "  *"
+        print(f"  {name:<32}{value}{marker}")
+    print("  (* = differs from built-in default)")
+
+# ==================== COMMAND LINE ====================
+def parse_args(argv=None):
+    # Opsi konfigurasi tanpa default: hanya yang diberikan yang meng-override config
+    parser = argparse.ArgumentParser(description="AgioControl - age detection & gesture volume control",
+                                     argument_default=argparse.SUPPRESS)
+    flag = argparse.BooleanOptionalAction
+    
+    run = parser.add_argument_group("run")
+    run.add_argument("--config", default=None, help="JSON file with configuration overrides")
+    run.add_argument("--profile", choices=sorted(PROFILES), help="Named performance profile (default: desktop)")
+    run.add_argument("--print-config", action="store_true", default=False,
+                     help="Print the effective configuration as JSON and exit")
+    run.add_argument("--replay-file", default=None,
+                     help="Canned landmarks (.npz) for the fake backends (default: built-in synthetic sequence)")
+    run.add_argument("--record-landmarks", default=None,
+                     help="Record per-frame backend output to this .npz file for later replay")
+    run.add_argument("--summarize", default=None, metavar="LOG_DIR",
+                     help="Print statistics over all session logs in LOG_DIR and exit")
+    run.add_argument("--soak", type=float, default=0, metavar="SECONDS",
+                     help="Run unattended at maximum rate for SECONDS and check memory/frame-time stability "
+                          "(implies --headless --loop, no volume control; defaults to the synthetic "
+                          "source and fake backends unless set explicitly)")
+    run.add_argument("--soak-report", default=None,
+                     help="Also write the soak report (with the effective config) as JSON to this path")
+    
+    capture = parser.add_argument_group("capture")
+    capture.add_argument("--source",
+                         help="Camera index, video file path, 'synthetic' or 'synthetic-camera' "
+                              "(paced, with a simulated driver queue for testing --drain) "
+                              "(default: scan camera indices)")
+    capture.add_argument("--camera-index", type=int, help="Camera index tried first when scanning")
+    capture.add_argument("--loop", action=flag, help="Restart file sources from the first frame at end of stream")
+    capture.add_argument("--headless", action=flag,
+                         help="Render overlays but never open a window (no keyboard controls)")
+    capture.add_argument("--capture-backend", choices=sorted(CAPTURE_BACKENDS), help="OpenCV capture backend")
+    capture.add_argument("--fourcc", help="Requested pixel format, e.g. MJPG or YUYV ('' keeps driver default)")
+    capture.add_argument("--width", type=int)
+    capture.add_argument("--height", type=int)
+    capture.add_argument("--capture-fps", type=float)
+    capture.add_argument("--buffer-size", type=int, help="Driver buffer depth in frames")
+    capture.add_argument("--drain", action=flag, help="Discard stale queued frames before each read")
+    capture.add_argument("--max-frame-width", type=int, help="Frames wider than this are resized before inference")
+    
+    inference = parser.add_argument_group("inference")
+    inference.add_argument("--face-detection", dest="face_detection_enabled", action=flag)
+    inference.add_argument("--age-estimation", dest="age_estimation_enabled", action=flag)
+    inference.add_argument("--face-detector", choices=sorted(FACE_DETECTOR_BACKENDS))
+    inference.add_argument("--face-landmarker", choices=sorted(FACE_LANDMARKER_BACKENDS))
+    inference.add_argument("--hand-landmarker", choices=sorted(HAND_LANDMARKER_BACKENDS))
+    inference.add_argument("--yunet-model-path", help="YuNet ONNX model for --face-detector opencv-dnn")
+    inference.add_argument("--face-model-selection", type=int, choices=(0, 1))
+    inference.add_argument("--face-detection-confidence", type=float)
+    inference.add_argument("--max-faces", dest="max_num_faces", type=int)
+    inference.add_argument("--face-mesh-detection-confidence", type=float)
+    inference.add_argument("--face-mesh-tracking-confidence", type=float)
+    inference.add_argument("--max-hands", dest="max_num_hands", type=int)
+    inference.add_argument("--hand-detection-confidence", type=float)
+    inference.add_argument("--hand-tracking-confidence", type=float)
+    
+    gesture = parser.add_argument_group("gesture & volume")
+    gesture.add_argument("--dist-min", type=int, help="Initial pinch distance mapped to 0%% volume (px)")
+    gesture.add_argument("--dist-max", type=int, help="Initial pinch distance mapped to 100%% volume (px)")
+    gesture.add_argument("--skeleton", dest="draw_skeleton", action=flag,
+                         help="Draw full hand skeletons (--no-skeleton draws only the controlling fingertips)")
+    gesture.add_argument("--volume-write-threshold", type=float,
+                         help="Minimum volume change (%%) before writing to the system mixer")
+    
+    smoothing = parser.add_argument_group("landmark smoothing")
+    smoothing.add_argument("--landmark-smoothing", action=flag,
+                           help="Filter the face landmarks used for age features and overlays over time")
+    smoothing.add_argument("--landmark-min-cutoff", type=float, help="One Euro minimum cutoff (Hz)")
+    smoothing.add_argument("--landmark-beta", type=float, help="One Euro speed coefficient")
+    
+    telemetry = parser.add_argument_group("telemetry")
+    telemetry.add_argument("--metrics-port", type=int,
+                           help="Serve Prometheus metrics on localhost at this port (0 = off)")
+    telemetry.add_argument("--session-log",
+                           help="Append per-frame records to rotating memory-mapped chunks in this directory")
+    telemetry.add_argument("--soak-max-rss-growth", dest="soak_max_rss_growth_mb", type=float, metavar="MB")
+    telemetry.add_argument("--soak-max-p99", dest="soak_max_p99_ms", type=float, metavar="MS")
+    args = parser.parse_args(argv)
+    if args.soak < 0:
+        parser.error("--soak must be >= 0 seconds")
+    return args
+
 # ==================== MAIN PROGRAM ====================
-def main():
-    volume, min_vol, max_vol = setup_volume_control()
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if args.summarize:
+        summary = summarize_session(args.summarize)
+        if summary is None:
+            print(f"No session records in {args.summarize}")
+        else:
+            print_session_summary(summary)
+        return
+    
+    try:
+        config = load_config(args)
+    except ValueError as e:
+        print(f"✗ Invalid configuration: {e}")
+        sys.exit(2)
+    
+    if args.print_config:
+        print(json.dumps(asdict(config), indent=2))
+        return
+    
+    print_config(config)
+    
+    if args.soak:
+        volume, min_vol, max_vol = None, None, None
+        print("Soak mode: volume control disabled")
+    else:
+        volume, min_vol, max_vol = setup_volume_control()
     VOLUME_ENABLED = volume is not None
+    initial_mute = volume.GetMute() if VOLUME_ENABLED else 0
     
     # Initialize improved age estimator
-    age_estimator = ImprovedAgeEstimator()
+    landmark_smoother = None
+    if config.landmark_smoothing:
+        landmark_smoother = LandmarkSmoother(min_cutoff=config.landmark_min_cutoff, beta=config.landmark_beta)
+        age_estimator = ImprovedAgeEstimator(SMOOTHED_AGE_HISTORY, SMOOTHED_FACE_SIZE_HISTORY)
+        age_display_len = SMOOTHED_AGE_DISPLAY_HISTORY
+    else:
+        age_estimator = ImprovedAgeEstimator()
+        age_display_len = AGE_DISPLAY_HISTORY
     
     print("\n" + "=" * 60)
     print("IMPROVED AGE DETECTION SYSTEM")
@@ -557,18 +2134,53 @@ def main():
     print("Tekan 'y' untuk kalibrasi, atau tombol lain untuk melanjuttan tanpa kalibrasi...")
     
     # Connect to camera
-    cap = connect_to_camera()
+    cap = connect_to_camera(config.source, config.capture_backend, config.fourcc or None,
+                            config.width, config.height, config.capture_fps, config.buffer_size,
+                            config.camera_index)
     if cap is None:
         sys.exit(1)
     
+    # File dan sumber sintetis tidak punya antrean frame basi untuk dibuang
+    drain = config.drain and is_camera_source(config.source)
+    if config.drain and not drain:
+        print("  Drain disabled: source is not a live camera (use 'synthetic-camera' to test drain)")
+    # buffer_size 0 berarti kedalaman bawaan driver, jadi batas drain tidak boleh ikut 0
+    max_drain = max(config.buffer_size, CAPTURE_MAX_DRAIN)
+    
+    try:
+        face_detection, face_mesh, hands = create_backends(config, args.replay_file)
+    except RuntimeError as e:
+        print(f"✗ Inference backend unavailable: {e}")
+        cap.release()
+        sys.exit(1)
+    recording = [] if args.record_landmarks else None
+    session_log = None
+    if config.session_log:
+        session_log = SessionLogger(config.session_log)
+        session_log.write_config(asdict(config))
+    
+    soak = None
+    soak_report = None
+    
+    metrics = PipelineMetrics(config.profile)
+    metrics_server = None
+    if config.metrics_port:
+        metrics_server = start_metrics_server(metrics, config.metrics_port)
+    
     # Variables
-    dist_min, dist_max = 30, 200
+    dist_min, dist_max = config.dist_min, config.dist_max
     vol_history = []
     calibration_mode = False
-    face_detection_enabled = FACE_DETECTION_ENABLED
-    age_estimation_enabled = AGE_ESTIMATION_ENABLED
+    face_detection_enabled = config.face_detection_enabled
+    age_estimation_enabled = config.age_estimation_enabled
     frame_count = 0
+    dropped_frames = 0
     last_time = time.time()
+    last_written_volume = None
+    pending_volume = None
+    gesture_engine = GestureEngine()
+    muted = False
+    gesture_paused = False
     
     # Statistics
     face_confidence_history = []
@@ -579,66 +2191,98 @@ def main():
     calibration_active = False
     calibrated_age = None
     
+    if args.soak:
+        soak = SoakMonitor(args.soak, max_rss_growth_mb=config.soak_max_rss_growth_mb,
+                           max_p99_ms=config.soak_max_p99_ms)
+    
     try:
         while True:
-            ret, frame = cap.read()
+            stage_start = frame_start = time.perf_counter()
+            ret, frame, dropped = read_frame(cap, drain, max_drain)
+            if not ret and config.loop:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame, dropped = read_frame(cap, drain, max_drain)
             if not ret:
                 print("Frame tidak terbaca...")
                 break
+            dropped_frames += dropped
+            metrics.frames_captured += 1 + dropped
+            metrics.frames_dropped += dropped
+            stage_end = time.perf_counter()
+            metrics.observe_stage("capture", stage_end - stage_start)
+            stage_start = stage_end
             
             frame_count += 1
             current_time = time.time()
             fps = 0
             if current_time - last_time >= 1.0:
                 fps = frame_count / (current_time - last_time)
+                metrics.fps = fps
                 frame_count = 0
                 last_time = current_time
             
             frame = cv2.flip(frame, 1)
             h, w = frame.shape[:2]
             
-            if w > 800:
-                scale = 800 / w
-                frame = cv2.resize(frame, (800, int(h * scale)))
+            if w > config.max_frame_width:
+                scale = config.max_frame_width / w
+                frame = cv2.resize(frame, (config.max_frame_width, int(h * scale)))
                 h, w = frame.shape[:2]
             
             rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            stage_end = time.perf_counter()
+            metrics.observe_stage("preprocess", stage_end - stage_start)
+            stage_start = stage_end
             
             # Process face detection
             face_count = 0
+            face_records = []
+            hand_distance = None
             avg_confidence = 0
             avg_age = 0
             avg_age_confidence = 0.7
             
+            detections = []
+            face_meshes = []
+            landmarks_smoothed = False
             if face_detection_enabled:
-                face_results = face_detection.process(rgb)
+                detections = face_detection.process(rgb)
                 
-                if face_results.detections:
-                    face_count = len(face_results.detections)
+                if detections:
+                    face_count = len(detections)
                     
-                    face_mesh_results = None
+                    feature_landmarks = []
                     if age_estimation_enabled:
-                        face_mesh_results = face_mesh.process(rgb)
+                        face_meshes = face_mesh.process(rgb)
+                        feature_landmarks = face_meshes
+                        if landmark_smoother is not None:
+                            feature_landmarks = landmark_smoother.update(face_meshes, frame_start)
+                            landmarks_smoothed = True
                     
-                    for i, detection in enumerate(face_results.detections):
+                    for i, detection in enumerate(detections):
+                        eye_points = None
+                        if landmark_smoother is not None and i < len(feature_landmarks):
+                            eye_points = [(feature_landmarks[i][k].x, feature_landmarks[i][k].y)
+                                          for k in OVERLAY_EYE_LANDMARKS]
                         estimated_age = None
                         age_group = None
                         age_color = None
                         age_confidence = 0.7
                         
                         if age_estimation_enabled:
-                            detect_conf, face_w, face_h = draw_face_info(
-                                frame, detection, w, h
-                            )
+                            # Overlay digambar sekali di bawah, setelah usia diketahui
+                            detect_conf = detection.score * 100
+                            face_w = int(detection.bbox[2] * w)
+                            face_h = int(detection.bbox[3] * h)
                             
                             # Prioritaskan metode yang lebih sederhana dan akurat
-                            if face_mesh_results and face_mesh_results.multi_face_landmarks:
-                                if i < len(face_mesh_results.multi_face_landmarks):
-                                    face_landmarks = face_mesh_results.multi_face_landmarks[i]
+                            if feature_landmarks:
+                                if i < len(feature_landmarks):
+                                    face_landmarks = feature_landmarks[i]
                                     
                                     # Ekstrak fitur wajah
                                     features = age_estimator.extract_facial_features(
-                                        face_landmarks.landmark, w, h
+                                        face_landmarks, w, h
                                     )
                                     
                                     if features:
@@ -665,16 +2309,18 @@ def main():
                             if estimated_age:
                                 age_history.append(estimated_age)
                                 age_confidence_history.append(age_confidence)
-                                if len(age_history) > 20:
+                                if len(age_history) > age_display_len:
                                     age_history.pop(0)
-                                if len(age_confidence_history) > 20:
+                                if len(age_confidence_history) > age_display_len:
                                     age_confidence_history.pop(0)
                             
                         # Draw face info
                         detect_conf, _, _ = draw_face_info(
-                            frame, detection, w, h, estimated_age, age_group, age_color, age_confidence
+                            frame, detection, w, h, estimated_age, age_group, age_color, age_confidence,
+                            eye_points
                         )
                         
+                        face_records.append((estimated_age, age_confidence, detect_conf))
                         face_confidence_history.append(detect_conf)
                         if len(face_confidence_history) > 10:
                             face_confidence_history.pop(0)
@@ -689,29 +2335,45 @@ def main():
                     if age_confidence_history:
                         avg_age_confidence = np.mean(age_confidence_history)
             
+            # Frame tanpa wajah tetap dihitung agar track lama kedaluwarsa
+            if landmark_smoother is not None and not landmarks_smoothed:
+                landmark_smoother.update([], frame_start)
+            
+            stage_end = time.perf_counter()
+            metrics.observe_stage("face", stage_end - stage_start)
+            stage_start = stage_end
+            
             # Process hand detection for volume control
-            hand_results = hands.process(rgb)
-            hand_detected = False
-            current_volume = 50
-            
-            if hand_results.multi_hand_landmarks:
-                hand_detected = True
-                for hand_landmarks in hand_results.multi_hand_landmarks:
-                    mp_drawing.draw_landmarks(
-                        frame, hand_landmarks, mp_hands.HAND_CONNECTIONS,
-                        mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2),
-                        mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=1)
-                    )
-                    
-                    lm = hand_landmarks.landmark
-                    idx = (int(lm[8].x * w), int(lm[8].y * h))
-                    thb = (int(lm[4].x * w), int(lm[4].y * h))
-                    
-                    cv2.circle(frame, idx, 8, (0, 0, 255), -1)
-                    cv2.circle(frame, thb, 8, (0, 0, 255), -1)
-                    cv2.line(frame, idx, thb, (0, 255, 255), 2)
-                    
-                    dist = math.sqrt((idx[0]-thb[0])**2 + (idx[1]-thb[1])**2)
+            hand_landmarks_list = hands.process(rgb)
+            gesture = gesture_engine.update(hand_landmarks_list, w, h)
+            hand_detected = gesture is not None
+            current_volume = np.mean(vol_history) if vol_history else 50
+            pinch_applied = False
+            
+            if hand_detected:
+                if config.draw_skeleton:
+                    for lm in hand_landmarks_list:
+                        draw_hand_skeleton(frame, lm, w, h)
+                
+                idx, thb = gesture.index_tip, gesture.thumb_tip
+                cv2.circle(frame, idx, 8, (0, 0, 255), -1)
+                cv2.circle(frame, thb, 8, (0, 0, 255), -1)
+                cv2.line(frame, idx, thb, (0, 255, 255), 2)
+                hand_distance = gesture.pinch_distance
+                
+                if gesture.event == "fist":
+                    muted = not muted
+                    if VOLUME_ENABLED:
+                        volume.SetMute(int(muted), None)
+                    print(f"Mute: {'ON' if muted else 'OFF'}")
+                elif gesture.event == "palm":
+                    gesture_paused = not gesture_paused
+                    print(f"Gesture volume: {'PAUSED' if gesture_paused else 'ACTIVE'}")
+                
+                # Volume hanya diubah bila frame ini juga pinch, agar fist/palm
+                # yang sedang di-hold tidak menarik volume ke 0%
+                if gesture.gesture == "pinch" and gesture.raw_gesture == "pinch" and not gesture_paused:
+                    dist = gesture.pinch_distance
                     
                     if not calibration_mode:
                         if 10 < dist < dist_min:
@@ -728,8 +2390,30 @@ def main():
                     current_volume = np.mean(vol_history)
                     
                     if VOLUME_ENABLED:
-                        vol_db = min_vol + (max_vol - min_vol) * (current_volume / 100.0)
-                        volume.SetMasterVolumeLevel(vol_db, None)
+                        # Lewati penulisan jika perubahan volume tidak terasa
+                        if should_write_volume(current_volume, last_written_volume, config.volume_write_threshold):
+                            write_volume(volume, min_vol, max_vol, current_volume)
+                            last_written_volume = current_volume
+                            pending_volume = None
+                            metrics.volume_writes += 1
+                        else:
+                            pending_volume = current_volume
+                            metrics.volume_writes_suppressed += 1
+                    pinch_applied = True
+            
+            # Pinch berhenti: tulis level terakhir yang sempat ditahan
+            if not pinch_applied and pending_volume is not None:
+                write_volume(volume, min_vol, max_vol, pending_volume)
+                last_written_volume = pending_volume
+                pending_volume = None
+                metrics.volume_writes += 1
+            
+            stage_end = time.perf_counter()
+            metrics.observe_stage("hands", stage_end - stage_start)
+            stage_start = stage_end
+            
+            if recording is not None:
+                record_landmarks(recording, detections, face_meshes, hand_landmarks_list)
             
             # ==================== LAYOUT ====================
             
@@ -768,6 +2452,10 @@ def main():
                 frame = create_volume_bar(frame, current_volume, 
                                          w - VOLUME_BAR_WIDTH - 20, 50, 
                                          VOLUME_BAR_WIDTH - 20, 200)
+                if muted or gesture_paused:
+                    cv2.putText(frame, "MUTED" if muted else "PAUSED",
+                               (w - VOLUME_BAR_WIDTH - 25, 290),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
             
             # Controls
             controls = "q=Quit r=Reset c=Calib f=Face a=Age k=CalibrateAge"
@@ -786,15 +2474,35 @@ def main():
                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 255), 1)
             
             # Show frame
-            cv2.imshow('Improved Age Detection System', frame)
+            key = 0xFF
+            if not config.headless:
+                cv2.imshow('Improved Age Detection System', frame)
+                
+                # Keyboard controls
+                key = cv2.waitKey(1) & 0xFF
+            
+            metrics.observe_stage("render", time.perf_counter() - stage_start)
+            metrics.frames_processed += 1
+            metrics.frames_with_face += int(face_count > 0)
+            metrics.frames_with_hand += int(hand_detected)
+            metrics.presence = int(face_count > 0)
+            
+            if session_log is not None:
+                session_log.log(current_time, face_records, hand_distance,
+                                current_volume if hand_detected else None,
+                                metrics.last_stage_latency.values())
+            
+            if soak is not None and not soak.tick(time.perf_counter() - frame_start):
+                break
             
-            # Keyboard controls
-            key = cv2.waitKey(1) & 0xFF
             if key == ord('q'):
                 break
             elif key == ord('r'):
-                dist_min, dist_max = 30, 200
+                dist_min, dist_max = config.dist_min, config.dist_max
                 vol_history.clear()
+                gesture_engine.reset()
+                if landmark_smoother is not None:
+                    landmark_smoother.reset()
                 age_estimator.age_history.clear()
                 print("Calibration and age history reset")
             elif key == ord('c'):
@@ -826,14 +2534,42 @@ def main():
     
     finally:
         cap.release()
-        cv2.destroyAllWindows()
+        if not config.headless:
+            cv2.destroyAllWindows()
+        for backend in (face_detection, face_mesh, hands):
+            backend.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        
+        if recording:
+            save_canned_landmarks(args.record_landmarks, recording)
+            print(f"Recorded {len(recording)} frames of landmarks to {args.record_landmarks}")
         
         if VOLUME_ENABLED:
-            vol_db = min_vol + (max_vol - min_vol) * 0.5
-            volume.SetMasterVolumeLevel(vol_db, None)
+            write_volume(volume, min_vol, max_vol, 50)
+            volume.SetMute(initial_mute, None)
             print("Volume reset to 50%")
         
-        if age_history:
+        if dropped_frames:
+            print(f"Stale frames drained: {dropped_frames}")
+        
+        if metrics.frames_processed:
+            print(f"\n=== STAGE LATENCY (mean ms, {metrics.frames_processed} frames, "
+                  f"profile {config.profile}) ===")
+            for stage, histogram in metrics.stage_latency.items():
+                counts, total = histogram.snapshot()
+                if sum(counts):
+                    print(f"  {stage:<11}{total / sum(counts) * 1000:.2f}")
+        
+        summary = None
+        if session_log is not None:
+            session_log.close()
+            summary = summarize_session(session_log.log_dir, session_log.session_pattern())
+            print(f"Session log: {session_log.records_written} records in {session_log.log_dir}")
+        
+        if summary is not None:
+            print_session_summary(summary, calibrated_age)
+        elif age_history:
             print(f"\n=== FINAL STATISTICS ===")
             print(f"Average Estimated Age: {np.mean(age_history):.1f} years")
             print(f"Age Range: {np.min(age_history)} - {np.max(age_history)} years")
@@ -842,7 +2578,23 @@ def main():
                 accuracy = 100 - abs(np.mean(age_history) - calibrated_age) / calibrated_age * 100
                 print(f"Estimated Accuracy: {accuracy:.1f}%")
         
+        if soak is not None:
+            soak_report = soak.finish()
+            soak_report["config"] = asdict(config)
+            soak_report["metrics"] = {
+                "frames_processed": metrics.frames_processed,
+                "frames_with_face": metrics.frames_with_face,
+                "frames_with_hand": metrics.frames_with_hand,
+            }
+            print_soak_report(soak_report)
+            if args.soak_report:
+                with open(args.soak_report, "w") as f:
+                    json.dump(soak_report, f, indent=2)
+        
         print("\nProgram terminated.")
+    
+    if soak_report is not None and not soak_report["passed"]:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()